@@ -0,0 +1,94 @@
+"""
+Measures the request throughput and latency of the ingestion routes of a single worker.
+
+It starts one uvicorn worker with the app and sends create_metric requests over keep-alive connections, then prints
+the throughput and the latency percentiles. Run it from the project root:
+
+    python benchmarks/ingestion_benchmark.py --requests 20000 --connections 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+
+async def send_requests(host: str, port: int, requests: int, payloads: list[bytes], latencies: list[float],
+                        statuses: dict[int, int]):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for index in range(requests):
+            payload = payloads[index % len(payloads)]
+            start_time = time.perf_counter()
+            writer.write(b'POST /create_metric HTTP/1.1\r\nHost: benchmark\r\nContent-Type: application/json\r\n'
+                         b'Content-Length: ' + str(len(payload)).encode() + b'\r\n\r\n' + payload)
+            await writer.drain()
+            status_line = await reader.readline()
+            content_length = 0
+            while True:
+                header = await reader.readline()
+                if header in (b'\r\n', b''):
+                    break
+                name, _, value = header.decode().partition(':')
+                if name.lower() == 'content-length':
+                    content_length = int(value)
+            await reader.readexactly(content_length)
+            latencies.append(time.perf_counter() - start_time)
+            status = int(status_line.split()[1])
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run_benchmark(host: str, port: int, requests: int, connections: int, metrics: int):
+    # a mix of counters and gauges with labels, updating already registered metrics after the first requests
+    payloads = []
+    for index in range(metrics):
+        payloads.append(json.dumps({'type': 1 + index % 2, 'metric_name': 'benchmark_metric_{}'.format(index),
+                                    'value': 1, 'labels': {'app': 'benchmark', 'node': str(index % 8)}}).encode())
+    latencies = []
+    statuses = {}
+    start_time = time.perf_counter()
+    await asyncio.gather(*(send_requests(host, port, requests // connections, payloads, latencies, statuses)
+                           for _ in range(connections)))
+    elapsed = time.perf_counter() - start_time
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    print('requests: {}, connections: {}, statuses: {}'.format(len(latencies), connections, statuses))
+    print('throughput: {:.0f} req/s'.format(len(latencies) / elapsed))
+    print('latency p50: {:.2f} ms, p99: {:.2f} ms, max: {:.2f} ms'.format(percentile(0.5), percentile(0.99),
+                                                                        latencies[-1] * 1000))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--connections', type=int, default=64)
+    parser.add_argument('--metrics', type=int, default=200)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    server = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'src.metrics_generator:app', '--port', str(args.port),
+                               '--log-level', 'warning'], env={**os.environ, 'PYTHONPATH': os.getcwd()})
+    try:
+        # wait for the worker to accept connections
+        for _ in range(100):
+            try:
+                socket.create_connection(('127.0.0.1', args.port)).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        asyncio.run(run_benchmark('127.0.0.1', args.port, args.requests, args.connections, args.metrics))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':
+    main()
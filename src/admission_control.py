@@ -0,0 +1,30 @@
+from starlette.responses import JSONResponse
+
+
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware that counts the requests in flight at the given paths and rejects the next ones with 429 when
+    max_in_flight is reached, instead of queueing them without limit. The counter is only changed from the event loop,
+    so it needs no lock.
+    """
+
+    def __init__(self, app, max_in_flight: int, paths: set[str]):
+        self.app = app
+        self.max_in_flight = max_in_flight
+        self.paths = paths
+        self.in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        if self.in_flight >= self.max_in_flight:
+            response = JSONResponse({'detail': 'Too many requests in flight.'}, status_code=429,
+                                    headers={'Retry-After': '1'})
+            await response(scope, receive, send)
+            return
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
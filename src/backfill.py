@@ -0,0 +1,99 @@
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+from src.metric_helpers import MetricType, set_metric_info
+
+
+def get_backfill_query_start_time(start_time: str, step_in_seconds: int, sequence_size: int) -> str:
+    """
+    Calculates from what time the telemetry metric must be queried, so that the first backfilled value has a full
+    window of past values.
+
+    :param start_time: The time of the first backfilled value, in '%Y-%m-%dT%H:%M:%SZ' format.
+    :param step_in_seconds: The time distance between each sample at telemetry metric.
+    :param sequence_size: The amount of samples that will be used as model input.
+
+    :return: The query start time in '%Y-%m-%dT%H:%M:%SZ' format.
+    """
+    query_start_time = datetime.strptime(start_time, '%Y-%m-%dT%H:%M:%SZ')
+    query_start_time = query_start_time - timedelta(seconds=(sequence_size - 1) * step_in_seconds)
+    return query_start_time.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def create_sliding_windows(results, sequence_size: int, start_timestamp: float) -> Tuple[List[float], List[memoryview]]:
+    """
+    Creates the model input window of every sample from start_timestamp on. All the values are stored once in an array
+    and every window is a memoryview of it, so no window is copied. Like prepare_results_for_model_input, a window
+    that has fewer past values than sequence_size is prepended with zeros.
+
+    :param results: The results returned from prometheus/Thanos query, a list of tuples (timestamp, value).
+    :param sequence_size: The amount of past values that the model will take as input.
+    :param start_timestamp: The unix timestamp of the first sample that needs a window.
+
+    :return: The timestamps of the samples and their windows.
+    """
+    values = array('d', [0.0] * (sequence_size - 1))
+    values.extend(float(value[1]) for value in results)
+    values_view = memoryview(values)
+    timestamps = []
+    windows = []
+    for index, value in enumerate(results):
+        if float(value[0]) < start_timestamp:
+            continue
+        timestamps.append(float(value[0]))
+        windows.append(values_view[index:index + sequence_size])
+    return timestamps, windows
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    escaped = ('{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"'))
+               for key, value in labels.items())
+    return '{' + ','.join(escaped) + '}'
+
+
+def format_openmetrics_backfill(metric_type: MetricType, metric_name: str, metric_info: str | None,
+                                series: List[Tuple[Dict[str, str], List[Tuple[float, float | str]]]],
+                                states: List[str] | None) -> str:
+    """
+    Formats backfilled values as an OpenMetrics file that can be imported with
+    'promtool tsdb create-blocks-from openmetrics'.
+
+    :param metric_type: The metric type. Counter values are accumulated like the increments of the counter route and
+    must not be negative.
+    :param metric_name: The metric name.
+    :param metric_info: The metric info.
+    :param series: A list with the labels of every series and its (timestamp, value) samples in time order.
+    :param states: The states of an Enum metric.
+
+    :return: The OpenMetrics text.
+    """
+    if metric_type == MetricType.Info:
+        raise ValueError('Info metrics can not be backfilled.')
+    if metric_type == MetricType.Counter and metric_name.endswith('_total'):
+        metric_name = metric_name[:-len('_total')]
+    openmetrics_type = {MetricType.Counter: 'counter', MetricType.Gauge: 'gauge', MetricType.Enum: 'stateset'}
+    lines = ['# TYPE {} {}'.format(metric_name, openmetrics_type[metric_type]),
+             '# HELP {} {}'.format(metric_name, set_metric_info(metric_name=metric_name, metric_info=metric_info))]
+    for labels, samples in series:
+        if metric_type == MetricType.Counter:
+            total = 0.0
+            for timestamp, value in samples:
+                # like the counter route, a counter is never decremented
+                if float(value) < 0:
+                    raise ValueError('Counters can only be incremented by non-negative amounts.')
+                total += float(value)
+                lines.append('{}_total{} {} {}'.format(metric_name, _format_labels(labels), total, timestamp))
+        elif metric_type == MetricType.Gauge:
+            for timestamp, value in samples:
+                lines.append('{}{} {} {}'.format(metric_name, _format_labels(labels), float(value), timestamp))
+        else:
+            if not states:
+                raise ValueError('states are required for an enum metric.')
+            for state in states:
+                state_labels = _format_labels({**labels, metric_name: state})
+                for timestamp, value in samples:
+                    lines.append('{}{} {} {}'.format(metric_name, state_labels, int(str(value) == state), timestamp))
+    lines.append('# EOF')
+    return '\n'.join(lines) + '\n'
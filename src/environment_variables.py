@@ -1,4 +1,17 @@
 import os
 
 PROMETHEUS_BASE_URL = os.getenv('PROMETHEUS_BASE_URL', 'http://91.138.223.127:30008/api/v1/query_range')
-INTELLIGENCE_API_BASE_URL = os.getenv('INTELLIGENCE_API_BASE_URL', 'http://10.160.3.151:3000/')
\ No newline at end of file
+INTELLIGENCE_API_BASE_URL = os.getenv('INTELLIGENCE_API_BASE_URL', 'http://10.160.3.151:3000/')
+# SQLite file (on a local filesystem) shared by the workers of a host to shard the model metric jobs. If not set, jobs
+# are not sharded.
+MODEL_METRIC_JOBS_STORE_PATH = os.getenv('MODEL_METRIC_JOBS_STORE_PATH', '')
+MODEL_METRIC_JOBS_SYNC_INTERVAL_SECONDS = float(os.getenv('MODEL_METRIC_JOBS_SYNC_INTERVAL_SECONDS', '5'))
+# JSON file with the metrics and model metric jobs to be created at startup. If not set, nothing is preloaded.
+PRELOAD_CONFIG_PATH = os.getenv('PRELOAD_CONFIG_PATH', '')
+PRELOAD_MAX_PARALLELISM = int(os.getenv('PRELOAD_MAX_PARALLELISM', '8'))
+# Maximum time a scrape waits for the lazy model metrics to be computed before serving the cached values
+LAZY_MODEL_METRICS_MAX_WAIT_SECONDS = float(os.getenv('LAZY_MODEL_METRICS_MAX_WAIT_SECONDS', '2'))
+# Enables the admin routes that profile the hot paths at runtime
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+# Maximum ingestion requests in flight at each worker, the next ones are rejected with 429
+MAX_IN_FLIGHT_INGESTION_REQUESTS = int(os.getenv('MAX_IN_FLIGHT_INGESTION_REQUESTS', '256'))
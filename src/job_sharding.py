@@ -0,0 +1,260 @@
+import bisect
+import hashlib
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+# Number of points every member takes at the hash ring, more points give a more even distribution of the jobs
+HASH_RING_VIRTUAL_NODES = 64
+# The connections of each thread to the stores and the stores whose tables have been created by this process
+_thread_connections = threading.local()
+_initialized_stores = set()
+_initialized_stores_lock = threading.Lock()
+
+
+def get_member_id() -> str:
+    """
+    Creates the id of the current worker process. It is unique among the workers of a replica and among the replicas.
+
+    :return: The member id as a string (hostname-pid).
+    """
+    return '{}-{}'.format(socket.gethostname(), os.getpid())
+
+
+def connect_jobs_store(store_path: str) -> sqlite3.Connection:
+    """
+    Returns the connection of the current thread to the jobs store, opening it at the first call of the thread. The
+    tables of the store are created once per process.
+
+    The store uses the WAL journal of SQLite, so it must be on a local filesystem and it can only be shared by the
+    workers of one host. It is a single-node stand-in for a shared coordination store, not placed on a network volume.
+
+    :param store_path: The path of the SQLite file of the store.
+
+    :return: The connection to the store.
+    """
+    connections = getattr(_thread_connections, 'connections', None)
+    if connections is None:
+        connections = _thread_connections.connections = {}
+    connection = connections.get(store_path)
+    if connection is not None:
+        return connection
+    connection = sqlite3.connect(store_path, timeout=10, isolation_level=None)
+    with _initialized_stores_lock:
+        if store_path not in _initialized_stores:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS members '
+                               '(member_id TEXT PRIMARY KEY, last_seen REAL NOT NULL)')
+            # the owner holds the lease of the job till lease_expires and the fencing token changes at every handover
+            connection.execute('CREATE TABLE IF NOT EXISTS jobs (metric_name TEXT PRIMARY KEY, request TEXT NOT NULL, '
+                               'owner TEXT, lease_expires REAL NOT NULL DEFAULT 0, '
+                               'fencing_token INTEGER NOT NULL DEFAULT 0)')
+            connection.execute('CREATE TABLE IF NOT EXISTS job_statuses '
+                               '(metric_name TEXT PRIMARY KEY, status TEXT NOT NULL)')
+            _initialized_stores.add(store_path)
+    connections[store_path] = connection
+    return connection
+
+
+def heartbeat_member(store_path: str, member_id: str):
+    """
+    Registers the member at the store or refreshes the time it was last seen.
+
+    :param store_path: The path of the SQLite file of the store.
+    :param member_id: The id of the member.
+
+    :return: None.
+    """
+    connection = connect_jobs_store(store_path)
+    connection.execute('INSERT OR REPLACE INTO members (member_id, last_seen) VALUES (?, ?)',
+                       (member_id, time.time()))
+
+
+def remove_member(store_path: str, member_id: str):
+    """
+    Removes the member from the store, so that its jobs are taken over by the other members.
+
+    :param store_path: The path of the SQLite file of the store.
+    :param member_id: The id of the member.
+
+    :return: None.
+    """
+    connection = connect_jobs_store(store_path)
+    connection.execute('DELETE FROM members WHERE member_id = ?', (member_id,))
+
+
+def get_active_members(store_path: str, member_ttl_seconds: float) -> list[str]:
+    """
+    Retrieves the members that have been seen within the ttl. Members that have not been seen are removed.
+
+    :param store_path: The path of the SQLite file of the store.
+    :param member_ttl_seconds: The amount of time in seconds after which a member that is not seen is considered gone.
+
+    :return: A sorted list with the ids of the active members.
+    """
+    connection = connect_jobs_store(store_path)
+    connection.execute('DELETE FROM members WHERE last_seen < ?', (time.time() - member_ttl_seconds,))
+    rows = connection.execute('SELECT member_id FROM members ORDER BY member_id').fetchall()
+    return [row[0] for row in rows]
+
+
+def save_job(store_path: str, metric_name: str, request_json: str) -> str | None:
+    """
+    Saves (or replaces the request of) a model metric job at the store. The lease of an existing job is kept.
+
+    :param store_path: The path of the SQLite file of the store.
+    :param metric_name: The metric name of the job.
+    :param request_json: The request of the job serialized as json.
+
+    :return: The request that was replaced serialized as json or None if the job is new.
+    """
+    connection = connect_jobs_store(store_path)
+    # a single transaction, so that only one of the members saving the same job at once finds it new
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        row = connection.execute('SELECT request FROM jobs WHERE metric_name = ?', (metric_name,)).fetchone()
+        connection.execute('INSERT OR IGNORE INTO jobs (metric_name, request) VALUES (?, ?)',
+                           (metric_name, request_json))
+        connection.execute('UPDATE jobs SET request = ? WHERE metric_name = ?', (request_json, metric_name))
+        connection.execute('COMMIT')
+    except Exception:
+        connection.execute('ROLLBACK')
+        raise
+    return row[0] if row else None
+
+
+def acquire_job_lease(store_path: str, metric_name: str, member_id: str, lease_seconds: float) -> int | None:
+    """
+    Takes (or renews) the lease of a model metric job. The lease is taken only if the job has no owner, its owner is
+    the member or the lease of its owner has expired, so a job changes owner only after it was released or its owner
+    is gone. The fencing token of the job is increased every time it changes owner.
+
+    :param store_path: The path of the SQLite file of the store.
+    :param metric_name: The metric name of the job.
+    :param member_id: The id of the member.
+    :param lease_seconds: The amount of time in seconds the lease is held without being renewed.
+
+    :return: The fencing token of the lease or None if the job is owned by another member or does not exist.
+    """
+    connection = connect_jobs_store(store_path)
+    now = time.time()
+    row = connection.execute('UPDATE jobs SET fencing_token = fencing_token + (owner IS NOT ?), owner = ?, '
+                             'lease_expires = ? WHERE metric_name = ? AND '
+                             '(owner IS NULL OR owner = ? OR lease_expires < ?) RETURNING fencing_token',
+                             (member_id, member_id, now + lease_seconds, metric_name, member_id, now)).fetchone()
+    return row[0] if row else None
+
+
+def release_job_lease(store_path: str, metric_name: str, member_id: str):
+    """
+    Gives back the lease of a model metric job, so that its next owner can take it without waiting for it to expire.
+
+    :param store_path: The path of the SQLite file of the store.
+    :param metric_name: The metric name of the job.
+    :param member_id: The id of the member holding the lease.
+
+    :return: None.
+    """
+    connection = connect_jobs_store(store_path)
+    connection.execute('UPDATE jobs SET owner = NULL, lease_expires = 0 WHERE metric_name = ? AND owner = ?',
+                       (metric_name, member_id))
+
+
+def delete_jobs(store_path: str, metric_names: list[str]):
+    """
+    Deletes model metric jobs and their statuses from the store. The members owning them will stop them at their next
+    sync.
+
+    :param store_path: The path of the SQLite file of the store.
+    :param metric_names: The metric names of the jobs.
+
+    :return: None.
+    """
+    connection = connect_jobs_store(store_path)
+    connection.executemany('DELETE FROM jobs WHERE metric_name = ?', [(name,) for name in metric_names])
+    connection.executemany('DELETE FROM job_statuses WHERE metric_name = ?', [(name,) for name in metric_names])
+
+
+def get_jobs(store_path: str) -> dict[str, str]:
+    """
+    Retrieves all the model metric jobs of the store.
+
+    :param store_path: The path of the SQLite file of the store.
+
+    :return: A dictionary with the metric names as keys and the requests serialized as json as values.
+    """
+    connection = connect_jobs_store(store_path)
+    rows = connection.execute('SELECT metric_name, request FROM jobs').fetchall()
+    return {metric_name: request_json for metric_name, request_json in rows}
+
+
+def save_job_status(store_path: str, metric_name: str, status_json: str, fencing_token: int | None = None):
+    """
+    Saves (or replaces) the status of a model metric job at the store.
+
+    :param store_path: The path of the SQLite file of the store.
+    :param metric_name: The metric name of the job.
+    :param status_json: The status of the job serialized as json.
+    :param fencing_token: If passed, the status is saved only if the job has not changed owner since the lease with
+    this token was taken.
+
+    :return: None.
+    """
+    connection = connect_jobs_store(store_path)
+    # the status of a job that was deleted from the store (or taken over by another member) is not saved
+    if fencing_token is None:
+        connection.execute('INSERT OR REPLACE INTO job_statuses (metric_name, status) '
+                           'SELECT metric_name, ? FROM jobs WHERE metric_name = ?', (status_json, metric_name))
+    else:
+        connection.execute('INSERT OR REPLACE INTO job_statuses (metric_name, status) '
+                           'SELECT metric_name, ? FROM jobs WHERE metric_name = ? AND fencing_token = ?',
+                           (status_json, metric_name, fencing_token))
+
+
+def get_job_statuses(store_path: str) -> dict[str, str]:
+    """
+    Retrieves the statuses of all the model metric jobs of the store.
+
+    :param store_path: The path of the SQLite file of the store.
+
+    :return: A dictionary with the metric names as keys and the statuses serialized as json as values.
+    """
+    connection = connect_jobs_store(store_path)
+    rows = connection.execute('SELECT metric_name, status FROM job_statuses').fetchall()
+    return {metric_name: status_json for metric_name, status_json in rows}
+
+
+def _hash(key: str) -> int:
+    return int(hashlib.md5(key.encode('utf-8')).hexdigest(), 16)
+
+
+def build_hash_ring(members: list[str]) -> tuple[list[int], list[str]]:
+    """
+    Builds the consistent hash ring of the members. Each member takes HASH_RING_VIRTUAL_NODES points at the ring, so
+    when a member joins or leaves only the jobs of its points are moved.
+
+    :param members: The ids of the members.
+
+    :return: The sorted points of the ring and the member that owns each point.
+    """
+    points = sorted((_hash('{}#{}'.format(member, i)), member)
+                    for member in members for i in range(HASH_RING_VIRTUAL_NODES))
+    return [point[0] for point in points], [point[1] for point in points]
+
+
+def get_job_owner(ring: tuple[list[int], list[str]], metric_name: str) -> str | None:
+    """
+    Finds the member that owns a job at the hash ring.
+
+    :param ring: The hash ring as returned from build_hash_ring.
+    :param metric_name: The metric name of the job.
+
+    :return: The id of the owner member or None if the ring is empty.
+    """
+    points, owners = ring
+    if not points:
+        return None
+    index = bisect.bisect(points, _hash(metric_name)) % len(points)
+    return owners[index]
@@ -1,10 +1,81 @@
+import bisect
 from prometheus_client import CollectorRegistry
+from prometheus_client.metrics_core import Metric
+from prometheus_client.registry import Collector
 from enum import Enum
-from pydantic import BaseModel
-from typing import Union, Dict, Optional
+from pydantic import BaseModel, Field, field_validator
+from typing import Union, Dict, Optional, Iterable
+from src.profiling import profiled
+
+
+class IndexedCollectorRegistry(CollectorRegistry):
+    """
+    A CollectorRegistry that also keeps the registered names sorted, so that metrics can be found by name or by name
+    prefix without scanning the whole registry.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._sorted_names: list[str] = []
+
+    def register(self, collector: Collector) -> None:
+        # the body of CollectorRegistry.register, so that both indexes are updated under a single hold of the lock
+        with self._lock:
+            names = self._get_names(collector)
+            duplicates = set(self._names_to_collectors).intersection(names)
+            if duplicates:
+                raise ValueError('Duplicated timeseries in CollectorRegistry: {}'.format(duplicates))
+            for name in names:
+                self._names_to_collectors[name] = collector
+                bisect.insort(self._sorted_names, name)
+            self._collector_to_names[collector] = names
+
+    def unregister(self, collector: Collector) -> None:
+        # the body of CollectorRegistry.unregister, so that both indexes are updated under a single hold of the lock
+        with self._lock:
+            for name in self._collector_to_names[collector]:
+                del self._names_to_collectors[name]
+                index = bisect.bisect_left(self._sorted_names, name)
+                if index < len(self._sorted_names) and self._sorted_names[index] == name:
+                    del self._sorted_names[index]
+            del self._collector_to_names[collector]
+
+    @profiled
+    def collect(self) -> Iterable[Metric]:
+        # the metrics are collected at once, so that the /metrics exposition is profiled as a single synchronous call
+        return iter(list(super().collect()))
+
+    def get_collector(self, name: str) -> None | Collector:
+        """
+        Retrieves the collector that exposes the given name.
+
+        :param name: The name of the metric (or of one of its time series e.g. with _total suffix).
+
+        :return: The collector that was found else None.
+        """
+        with self._lock:
+            return self._names_to_collectors.get(name)
+
+    def get_collectors_by_prefix(self, prefix: str) -> list[Collector]:
+        """
+        Retrieves the collectors that expose a name starting with the given prefix.
+
+        :param prefix: The prefix of the metric names.
+
+        :return: A list with the collectors found.
+        """
+        collectors = {}
+        with self._lock:
+            index = bisect.bisect_left(self._sorted_names, prefix)
+            while index < len(self._sorted_names) and self._sorted_names[index].startswith(prefix):
+                collector = self._names_to_collectors[self._sorted_names[index]]
+                collectors[id(collector)] = collector
+                index += 1
+        return list(collectors.values())
+
 
 # Initialize the custom registry
-my_registry = CollectorRegistry()
+my_registry = IndexedCollectorRegistry()
 
 
 def set_metric_info(metric_name: str, metric_info: str | None) -> str:
@@ -31,6 +102,11 @@ class MetricType(Enum):
     Enum = 4
 
 
+class ProfilingMode(Enum):
+    Sampling = 'sampling'
+    Deterministic = 'deterministic'
+
+
 class MetricItemRequest(BaseModel):
     type: MetricType
     metric_name: str
@@ -41,7 +117,10 @@ class MetricItemRequest(BaseModel):
 
 
 class UnregisterMetricItemRequest(BaseModel):
-    metric_name: str
+    metric_name: Optional[str] = None
+    metric_names: Optional[list[str]] = []
+    metric_name_prefix: Optional[str] = None
+    labels: Optional[Dict[str, str | int | float]] = {}
 
 
 class CreateModelMetricItemRequest(BaseModel):
@@ -56,7 +135,42 @@ class CreateModelMetricItemRequest(BaseModel):
     model_type: str
     step_in_seconds: int
     sequence_size: int
+    horizon_label: Optional[str] = None
+    wait_first_cycle: Optional[bool] = True
+    lazy_ttl_seconds: Optional[float] = Field(default=None, gt=0)
+
+    # the metric name is the job id, so it is normalized once for the job, its status and the store
+    @field_validator('metric_name')
+    @classmethod
+    def strip_metric_name(cls, metric_name: str) -> str:
+        return metric_name.strip()
 
 
 class StopModelMetricItemRequest(BaseModel):
     metric_names: list[str]
+
+
+class PreloadMetricItem(BaseModel):
+    type: MetricType
+    metric_name: str
+    metric_info: Optional[str] = None
+    labels: Optional[list[str]] = []
+    states: Optional[list[str]] = []
+
+
+class PreloadConfig(BaseModel):
+    metrics: Optional[list[PreloadMetricItem]] = []
+    model_metrics: Optional[list[CreateModelMetricItemRequest]] = []
+
+
+class StartProfilingItemRequest(BaseModel):
+    mode: ProfilingMode = ProfilingMode.Sampling
+    duration_seconds: float = 60
+    sampling_interval_seconds: Optional[float] = 0.01
+
+
+class BackfillModelMetricItemRequest(CreateModelMetricItemRequest):
+    start_time: str
+    end_time: str
+    batch_size: Optional[int] = 256
+    timeout_seconds: Optional[int] = 60
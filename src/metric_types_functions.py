@@ -2,9 +2,11 @@ from typing import Optional, Dict, Union, List
 
 from prometheus_client import Gauge, Counter, Info, Enum
 from prometheus_client.registry import Collector
-from src.metric_helpers import my_registry, set_metric_info, set_label_keys
+from src.metric_helpers import my_registry, set_metric_info, set_label_keys, MetricType
+from src.profiling import profiled
 
 
+@profiled
 def counter(existing_metric: None | Collector, metric_name: str, metric_info: str | None,
             labels: Optional[Dict[str, str | int | float]], value: float):
     """
@@ -43,6 +45,7 @@ def counter(existing_metric: None | Collector, metric_name: str, metric_info: st
             existing_metric.inc(amount=value)
 
 
+@profiled
 def gauge(existing_metric: None | Collector, metric_name: str, metric_info: str | None,
           labels: Optional[Dict[str, str | int | float]], value: Union[float, str]):
     """
@@ -77,6 +80,7 @@ def gauge(existing_metric: None | Collector, metric_name: str, metric_info: str
             existing_metric.set(value=value)
 
 
+@profiled
 def info(existing_metric: None | Collector, metric_name: str, metric_info: str | None,
          labels: Optional[Dict[str, str | int | float]], value: Dict[str, str | float]):
     """
@@ -118,6 +122,7 @@ def info(existing_metric: None | Collector, metric_name: str, metric_info: str |
             existing_metric.info(val=value)
 
 
+@profiled
 def enum(existing_metric: None | Collector, metric_name: str, metric_info: str | None,
          labels: Optional[Dict[str, str | int | float]], states: List[str], state: str):
     """
@@ -156,3 +161,31 @@ def enum(existing_metric: None | Collector, metric_name: str, metric_info: str |
             existing_metric.labels(**labels).state(state=state)
         else:
             existing_metric.state(state=state)
+
+
+def register_metric(metric_type: MetricType, metric_name: str, metric_info: str | None, label_names: List[str],
+                    states: List[str]) -> Collector:
+    """
+    Registers a metric without setting a value, so that it can be updated later. A labeled metric has no children
+    until its first update.
+
+    :param metric_type: The metric type.
+    :param metric_name: The metric name.
+    :param metric_info: The metric info.
+    :param label_names: The label names of the metric.
+    :param states: The states that will be available for an Enum metric.
+
+    :return: The metric registered.
+    """
+    # set metric info
+    metric_info = set_metric_info(metric_name=metric_name, metric_info=metric_info)
+    if metric_type == MetricType.Counter:
+        return Counter(name=metric_name, documentation=metric_info, labelnames=label_names, registry=my_registry)
+    if metric_type == MetricType.Gauge:
+        return Gauge(name=metric_name, documentation=metric_info, labelnames=label_names, registry=my_registry)
+    if metric_type == MetricType.Info:
+        return Info(name=metric_name, documentation=metric_info, labelnames=label_names, registry=my_registry)
+    if not states:
+        raise ValueError('states are required for an enum metric.')
+    return Enum(name=metric_name, documentation=metric_info, labelnames=label_names, states=states,
+                registry=my_registry)
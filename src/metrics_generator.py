@@ -1,17 +1,32 @@
+import asyncio
 import logging
+import json
 import time
 import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
 from prometheus_client import make_asgi_app
 from prometheus_client.multiprocess import MultiProcessCollector
 from prometheus_client.registry import Collector
 from src.metric_helpers import my_registry, MetricType, MetricItemRequest, UnregisterMetricItemRequest
-from src.metric_helpers import CreateModelMetricItemRequest, StopModelMetricItemRequest
-from src.metric_types_functions import counter, gauge, info, enum
+from src.metric_helpers import CreateModelMetricItemRequest, StopModelMetricItemRequest, PreloadConfig
+from src.metric_helpers import StartProfilingItemRequest, BackfillModelMetricItemRequest
+from src.metric_types_functions import counter, gauge, info, enum, register_metric
 from src.step1_querry_to_premetheus import create_prometheus_range_query_url, call_prometheus_query_url_with_timeout
 from src.step2_intelligence_layer_call import call_intelligence_api_model, prepare_results_for_model_input
-from src.environment_variables import PROMETHEUS_BASE_URL
+from src.backfill import get_backfill_query_start_time, create_sliding_windows, format_openmetrics_backfill
+from src.environment_variables import PROMETHEUS_BASE_URL, MODEL_METRIC_JOBS_STORE_PATH
+from src.environment_variables import MODEL_METRIC_JOBS_SYNC_INTERVAL_SECONDS
+from src.environment_variables import PRELOAD_CONFIG_PATH, PRELOAD_MAX_PARALLELISM
+from src.environment_variables import LAZY_MODEL_METRICS_MAX_WAIT_SECONDS, PROFILING_ENABLED
+from src.environment_variables import MAX_IN_FLIGHT_INGESTION_REQUESTS
+from src.profiling import profiled, start_profiling, stop_profiling
+from src.admission_control import AdmissionControlMiddleware
+from src.job_sharding import get_member_id, heartbeat_member, remove_member, get_active_members, save_job, delete_jobs
+from src.job_sharding import get_jobs, build_hash_ring, get_job_owner, save_job_status, get_job_statuses
+from src.job_sharding import acquire_job_lease, release_job_lease
 
 
 # Using multiprocess collector for registry
@@ -22,6 +37,10 @@ def make_metrics_app(custom_registry):
 
 # Create app
 app = FastAPI(debug=False)
+# Reject the ingestion requests with 429 when too many of them are in flight
+app.add_middleware(AdmissionControlMiddleware, max_in_flight=MAX_IN_FLIGHT_INGESTION_REQUESTS,
+                   paths={'/create_metric', '/unregister_metric', '/create_model_metric', '/stop_model_metrics',
+                          '/backfill_model_metric'})
 # set a logger
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -29,13 +48,43 @@ logger = logging.getLogger(__name__)
 registry = my_registry
 # Add prometheus asgi middleware to route /metrics requests
 metrics_app = make_asgi_app(registry)
-app.mount("/metrics", metrics_app)
+
+
+# Refresh the stale lazy model metrics before each scrape
+async def lazy_refresh_metrics_app(scope, receive, send):
+    await refresh_lazy_model_metrics()
+    await metrics_app(scope, receive, send)
+
+
+app.mount("/metrics", lazy_refresh_metrics_app)
 # Global dictionary to store threads and stop events
 threads = {}
 stop_events = {}
+job_statuses = {}
+# Global dictionary to store the model metric jobs that are computed on scrape and the executor that computes them
+lazy_model_metric_jobs = {}
+lazy_model_metrics_executor = ThreadPoolExecutor(thread_name_prefix='lazy_model_metrics')
+# The lock of the job dictionaries. It is taken by the /metrics scrapes on the event loop, so it is never held across
+# I/O such as the calls to the jobs store or the joins of the job threads
+jobs_lock = threading.Lock()
+# The requests of the local model metric jobs and, if jobs are sharded, the fencing token and the expiry time of the
+# lease this worker holds for each of them
+model_metric_job_requests = {}
+model_metric_job_leases = {}
+# The restarts of the failed model metric jobs and the time of their next restart, each one waits twice as long as the
+# previous one up to MAX_MODEL_METRIC_JOB_RESTART_BACKOFF_SECONDS
+model_metric_job_restarts = {}
+MAX_MODEL_METRIC_JOB_RESTART_BACKOFF_SECONDS = 300
+# Id of this worker at the jobs store and the event that stops its jobs coordinator
+member_id = get_member_id()
+coordinator_stop_event = threading.Event()
+# Event set when the preload of the startup is completed and its summary
+bootstrap_done = threading.Event()
+bootstrap_summary = {}
 
 
 # Function to get an existing metric by name from the registry
+@profiled
 def get_metric_by_name_and_type(metric_name: str, metric_type: MetricType) -> None | Collector:
     """
     Retrieves the metric that was registered with the given name.
@@ -46,20 +95,19 @@ def get_metric_by_name_and_type(metric_name: str, metric_type: MetricType) -> No
 
     :return: The metric that was found else None
     """
-    for collector in registry._collector_to_names.keys():
-        # Check if this collector is the one we're looking for based on its name
-        if metric_name in registry._collector_to_names[collector]:
-            collector_type = type(collector).__name__.lower()
-            metric_type = metric_type.name.lower()
-            if collector_type != metric_type:
-                http_err = 'Metric name matches an already registered metric with different type.'
-                logger.error(http_err)
-                raise HTTPException(status_code=400, detail=http_err)
-            return collector
-    return None
+    collector = registry.get_collector(metric_name)
+    if collector is not None:
+        collector_type = type(collector).__name__.lower()
+        metric_type = metric_type.name.lower()
+        if collector_type != metric_type:
+            http_err = 'Metric name matches an already registered metric with different type.'
+            logger.error(http_err)
+            raise HTTPException(status_code=400, detail=http_err)
+    return collector
 
 
 # Get the labels that were set at the first registration of a metric
+@profiled
 def get_existing_metric_labels(metric: Collector) -> dict[str, str] | None:
     """
     Retrieve the labels of an existing metric.
@@ -80,11 +128,16 @@ def get_existing_metric_labels(metric: Collector) -> dict[str, str] | None:
     # adjust Enum metric type (it is 'stateset')
     if metric_type == 'enum':
         metric_type = 'stateset'
-    for metric_registered in registry.collect():
+    # collect only this metric instead of the whole registry
+    for metric_registered in metric.collect():
         if metric_registered.type == metric_type:
             for sample in metric_registered.samples:
                 if sample.name == metric_name:
                     return sample.labels
+    # a labeled metric that was registered without children (e.g. preloaded) has no samples yet
+    label_names = getattr(metric, '_labelnames', ())
+    if label_names:
+        return {label: '' for label in label_names}
     return None
 
 
@@ -123,7 +176,7 @@ def read_root():
     return
 
 
-@app.post('/create_metric')
+@profiled
 def create_metric(request: MetricItemRequest):
     """
     create_metric route will receive a json payload to create or update a metric.
@@ -256,41 +309,142 @@ def create_metric(request: MetricItemRequest):
     return {'message': 'Metric updated successfully.'}
 
 
+# the route runs in the event loop (no threadpool), as updating the registry does not block
+@app.post('/create_metric', description=create_metric.__doc__)
+async def create_metric_endpoint(request: MetricItemRequest):
+    return create_metric(request)
+
+
+def remove_matching_metric_children(metric: Collector, labels: dict[str, str | int | float]) -> int:
+    """
+    Removes the children of a metric whose labels match all the labels passed.
+
+    :param metric: The metric as a Collector.
+    :param labels: The labels and values that the children to be removed must have.
+
+    :return: The number of children removed.
+    """
+    label_names = getattr(metric, '_labelnames', ())
+    # a metric without the label names passed has no matching children
+    if not label_names or not all(label in label_names for label in labels):
+        return 0
+    matcher = [(label_names.index(label), str(value)) for label, value in labels.items()]
+    removed = 0
+    for label_values in list(metric._metrics.keys()):
+        if all(label_values[index] == value for index, value in matcher):
+            metric.remove(*label_values)
+            removed += 1
+    return removed
+
+
 # unregister metrics that have been created
 @app.post('/unregister_metric')
-def unregister_metric(request: UnregisterMetricItemRequest):
+async def unregister_metric(request: UnregisterMetricItemRequest):
     """
-    unregister_metric route will receive a json payload to unregister a metric.
+    unregister_metric route will receive a json payload to unregister one or more metrics of any type.
 
-    :param request: The json passed will contain:
+    :param request: The json passed will contain at least one of:
+
+    - metric_name (optional): The name of the metric to be unregistered.
+    - metric_names (optional): A list with the names of the metrics to be unregistered.
+    - metric_name_prefix (optional): All the metrics with names starting with this prefix will be unregistered.
 
-    - metric_name (mandatory): The name of the metric to be unregistered.
+    and optionally:
 
-    :return: a json response (200) if metric is unregistered successfully.
+    - labels (optional): If passed, the metrics found are not unregistered, but only their children with matching
+    labels are removed.
+
+    :return: a json response (200) if metric(s) are unregistered successfully.
     """
-    # check if counter metric already exists and has the same type
-    # if it already exists then reset it
-    try:
-        existing_counter_metric = get_metric_by_name_and_type(request.metric_name, MetricType.Gauge)
-        if existing_counter_metric is not None:
-            registry.unregister(existing_counter_metric)
-            return {'message': 'Unregistered metric successfully.'}
+    metric_names = list(request.metric_names or [])
+    if request.metric_name:
+        metric_names.append(request.metric_name)
+    metric_names = [metric_name.strip() for metric_name in metric_names if metric_name and metric_name.strip()]
+    if not metric_names and not request.metric_name_prefix:
+        http_err = 'metric_name, metric_names or metric_name_prefix is required.'
+        logger.error(http_err)
+        raise HTTPException(status_code=400, detail=http_err)
+
+    # find the metrics by name and by prefix
+    metrics = {}
+    for metric_name in metric_names:
+        metric = registry.get_collector(metric_name)
+        if metric is not None:
+            metrics[id(metric)] = metric
+    if request.metric_name_prefix:
+        for metric in registry.get_collectors_by_prefix(request.metric_name_prefix):
+            metrics[id(metric)] = metric
+    if not metrics:
         return {'message': 'Metric not found. You can create a new one.'}
-    except HTTPException as http_exc:
-        # Log the exception or do additional processing
-        logger.error('HTTPException: {}'.format(http_exc.detail))
-        # Re-raise the HTTPException for FastAPI to handle
-        raise http_exc
 
+    # remove only the children that match the labels
+    if request.labels:
+        removed_children = 0
+        for metric in metrics.values():
+            removed_children += remove_matching_metric_children(metric, request.labels)
+        return {'message': 'Removed {} metric children successfully.'.format(removed_children)}
+
+    unregistered_metrics = []
+    for metric in metrics.values():
+        registry.unregister(metric)
+        unregistered_metrics.append(metric._name)
+    logger.info('Unregistered metrics: {}'.format(unregistered_metrics))
+    return {'message': 'Unregistered metric successfully.' if len(unregistered_metrics) == 1 else
+            'Unregistered {} metrics successfully.'.format(len(unregistered_metrics))}
 
-def repeated_operation(request: CreateModelMetricItemRequest, exception_list, first_cycle_done):
+
+def get_model_result_horizon(model_result) -> list:
+    """
+    Retrieves all the output steps (horizon) of the first model result.
+
+    :param model_result: The json response of the Intelligence API model inference.
+
+    :return: A list with the values of each output step.
+    """
+    horizon = model_result[0]
+    # a model with a single output may return the value itself instead of a list
+    if not isinstance(horizon, list):
+        return [horizon]
+    return horizon
+
+
+def publish_model_result(request: CreateModelMetricItemRequest, model_result):
+    """
+    Posts the result of a model inference to the metric of the job.
+
+    :param request: The request of the model metric job.
+    :param model_result: The json response of the Intelligence API model inference.
+
+    :return: None
+    """
+    data = request.dict(include={
+        'type',
+        'metric_name',
+        'metric_info',
+        'labels',
+        'states'
+    })
+    if request.horizon_label:
+        # publish every step of the model output as a labeled child of the same metric
+        for step, step_result in enumerate(get_model_result_horizon(model_result)):
+            step_data = dict(data)
+            step_data['labels'] = {**(data['labels'] or {}), request.horizon_label: str(step)}
+            step_data['value'] = step_result
+            create_metric(MetricItemRequest(**step_data))
+    else:
+        data['value'] = model_result[0][0]
+        create_metric(MetricItemRequest(**data))
+
+
+@profiled
+def repeated_operation(request: CreateModelMetricItemRequest, exception_list, lazy_job: None | dict = None):
     """
     The whole operation that will run repeatedly to get data from Prometheus/Thanos, call an intelligence api model and
     post the metric.
 
     :param request: The request contains all the info needed (model name, query, sequence size, steps etc.).
     :param exception_list: A list to store exceptions.
-    :param first_cycle_done: An Event to signal the completion of the first cycle.
+    :param lazy_job: The lazy job as stored in lazy_model_metric_jobs if the operation computes a lazy job on scrape.
 
     :return: None
     """
@@ -314,28 +468,119 @@ def repeated_operation(request: CreateModelMetricItemRequest, exception_list, fi
             if model_result_status_code != 200:
                 http_err = 'Intelligence API error or endpoint does not exist.'
                 raise HTTPException(status_code=400, detail=http_err)
-            model_result = model_result[0][0]
+            # a job whose lease was released or has expired must not publish, its next owner may already run it
+            if not holds_model_metric_job_lease(request.metric_name):
+                http_err = 'The lease of the job is not held by this worker.'
+                raise HTTPException(status_code=400, detail=http_err)
             # post the result
-            data = request.dict(include={
-                'type',
-                'metric_name',
-                'metric_info',
-                'labels',
-                'states'
-            })
-            data['value'] = model_result
-            create_metric(MetricItemRequest(**data))
+            if lazy_job is None:
+                publish_model_result(request, model_result)
+            else:
+                # a lazy job that was stopped or released while it was computed must not publish
+                with jobs_lock:
+                    if lazy_model_metric_jobs.get(request.metric_name) is not lazy_job:
+                        http_err = 'The job was stopped while it was computed.'
+                        raise HTTPException(status_code=400, detail=http_err)
+                    publish_model_result(request, model_result)
         else:
             # If result is None, exception must be thrown for empty data
             http_err = 'Telemetry metric not found or returned null results.'
             raise HTTPException(status_code=400, detail=http_err)
     except Exception as e:
         exception_list.append(e)
+
+
+def create_model_metric_job_status(metric_name: str) -> dict:
+    """
+    Creates the status of a model metric job that has not run its first cycle yet.
+
+    :param metric_name: The metric name of the job, used as the job id.
+
+    :return: The status as a dictionary.
+    """
+    return {
+        'job_id': metric_name,
+        'owner': member_id,
+        'first_cycle_status': 'pending',
+        'first_cycle_error': None,
+        'last_run_time': None,
+        'last_error': None,
+        'last_error_time': None,
+        'cycles': 0,
+        'failed_cycles': 0,
+        'latency_last_seconds': None,
+        'latency_mean_seconds': None,
+        'latency_min_seconds': None,
+        'latency_max_seconds': None,
+    }
+
+
+def update_model_metric_job_status(status: dict, start_time: float, latency: float, error: None | Exception):
+    """
+    Updates the status of a model metric job with the results of a cycle. If jobs are sharded, the status is also
+    saved at the store so that it can be retrieved from any worker.
+
+    :param status: The status of the job as created from create_model_metric_job_status.
+    :param start_time: The time the cycle started.
+    :param latency: The time in seconds the cycle took.
+    :param error: The exception raised at the cycle or None.
+
+    :return: None.
+    """
+    run_time = datetime.utcfromtimestamp(start_time).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+    if status['cycles'] == 0:
+        status['first_cycle_status'] = 'failed' if error else 'succeeded'
+        status['first_cycle_error'] = '{}'.format(error) if error else None
+    status['last_run_time'] = run_time
+    if error:
+        status['last_error'] = '{}'.format(error)
+        status['last_error_time'] = run_time
+        status['failed_cycles'] += 1
+    status['cycles'] += 1
+    status['latency_last_seconds'] = latency
+    if status['cycles'] == 1:
+        status['latency_mean_seconds'] = status['latency_min_seconds'] = status['latency_max_seconds'] = latency
+    else:
+        status['latency_mean_seconds'] += (latency - status['latency_mean_seconds']) / status['cycles']
+        status['latency_min_seconds'] = min(status['latency_min_seconds'], latency)
+        status['latency_max_seconds'] = max(status['latency_max_seconds'], latency)
+    # save the status only while the job is still registered at this worker and has not changed owner
+    lease = model_metric_job_leases.get(status['job_id'])
+    if MODEL_METRIC_JOBS_STORE_PATH and job_statuses.get(status['job_id']) is status and lease is not None:
+        try:
+            save_job_status(MODEL_METRIC_JOBS_STORE_PATH, status['job_id'], json.dumps(status), fencing_token=lease[0])
+        except Exception as e:
+            logger.error('An error occurred in update_model_metric_job_status: {}'.format(e))
+
+
+def run_model_metric_cycle(request: CreateModelMetricItemRequest, exception_list, first_cycle_done,
+                           status: None | dict, lazy_job: None | dict = None) -> float:
+    """
+    Runs one cycle of the repeated operation and records its result at the status of the job. The completion of the
+    cycle is signaled after the status is updated, so that whoever waits for it reads the status of the cycle.
+
+    :param request: The request contains all the info needed (model name, query, sequence size, steps etc.).
+    :param exception_list: A list to store exceptions.
+    :param first_cycle_done: An Event to signal the completion of the first cycle.
+    :param status: The status of the job or None if it is not tracked.
+    :param lazy_job: The lazy job as stored in lazy_model_metric_jobs if the cycle computes a lazy job on scrape.
+
+    :return: The time the cycle started.
+    """
+    start_time = time.time()
+    errors_before = len(exception_list)
+    try:
+        repeated_operation(request, exception_list, lazy_job)
+        if status is not None:
+            error = exception_list[-1] if len(exception_list) > errors_before else None
+            update_model_metric_job_status(status, start_time, time.time() - start_time, error)
     finally:
         first_cycle_done.set()
+    return start_time
 
 
-def create_model_telemetry_metric(request: CreateModelMetricItemRequest, exception_list, first_cycle_done, stop_event):
+def create_model_telemetry_metric(request: CreateModelMetricItemRequest, exception_list, first_cycle_done, stop_event,
+                                  status=None):
     """
     create_model_telemetry_metric will receive a json payload to create a metric based on specific telemetry data
     that will be retrieved and a model that must exist at Intelligence layer.
@@ -344,32 +589,423 @@ def create_model_telemetry_metric(request: CreateModelMetricItemRequest, excepti
     :param exception_list: used to catch the error that could occur at the first execution.
     :param first_cycle_done: An Event to signal the completion of the first cycle.
     :param stop_event: An Event to signal the alt execution.
+    :param status: The status of the job that is updated after every cycle (optional).
 
     :return: None.
     """
     try:
-        start_time = time.time()
         # Run the first cycle
-        repeated_operation(request, exception_list, first_cycle_done)
+        start_time = run_model_metric_cycle(request, exception_list, first_cycle_done, status)
         if exception_list:
             raise exception_list[0]
         # Wait for the next time interval, taking into account the time already elapsed
         time_to_next_interval = max(request.step_in_seconds - (time.time() - start_time), 0)
-        time.sleep(time_to_next_interval)
+        stop_event.wait(time_to_next_interval)
 
         # Start a loop to run the operation repeatedly
         while not stop_event.is_set():
-            start_time = time.time()
             # Run the repeated operation
-            repeated_operation(request, exception_list, first_cycle_done)
+            start_time = run_model_metric_cycle(request, exception_list, first_cycle_done, status)
+            # errors after the first cycle are only kept at the status of the job
+            exception_list.clear()
             # Wait for the next time interval, taking into account the time already elapsed
             # time_to_next_interval = max(request.step_in_seconds - (time.time() - start_time), 0)
             time_to_next_interval = max(request.step_in_seconds - (time.time() - start_time), 0)
-            time.sleep(time_to_next_interval)
+            stop_event.wait(time_to_next_interval)
     except Exception as e:
         return e
 
 
+def start_model_metric_job(request: CreateModelMetricItemRequest, status: None | dict = None):
+    """
+    Starts the thread that will run the model metric job repeatedly.
+
+    :param request: The request of the model metric job.
+    :param status: The status of a job that is restarted, so that it keeps counting its cycles, or None for a new job.
+
+    :return: The thread, its stop event, the list of exceptions, the event of the first cycle completion and the
+    status of the job.
+    """
+    stop_event = threading.Event()
+    exception_list = []
+    first_cycle_done = threading.Event()
+    if status is None:
+        status = create_model_metric_job_status(request.metric_name)
+    job_thread = threading.Thread(target=create_model_telemetry_metric, args=(request, exception_list,
+                                                                              first_cycle_done, stop_event, status))
+    job_thread.start()
+    return job_thread, stop_event, exception_list, first_cycle_done, status
+
+
+def register_model_metric_job(metric_name: str, request: CreateModelMetricItemRequest, job_thread: threading.Thread,
+                              stop_event: threading.Event, status: dict):
+    """
+    Stores the request, the thread, the stop event and the status of a local model metric job in the global
+    dictionaries. A previous job with the same metric name is stopped. Must be called while holding jobs_lock.
+
+    :param metric_name: The metric name of the job.
+    :param request: The request of the job.
+    :param job_thread: The thread of the job.
+    :param stop_event: The stop event of the job.
+    :param status: The status of the job.
+
+    :return: None.
+    """
+    pop_model_metric_job(metric_name)
+    model_metric_job_requests[metric_name] = request
+    threads[metric_name] = job_thread
+    stop_events[metric_name] = stop_event
+    job_statuses[metric_name] = status
+
+
+def register_lazy_model_metric_job(metric_name: str, request: CreateModelMetricItemRequest, status: dict,
+                                   computed_at: float = 0.0):
+    """
+    Stores a model metric job that is computed on scrape instead of on a timer. A previous job with the same metric
+    name is stopped. Must be called while holding jobs_lock.
+
+    :param metric_name: The metric name of the job.
+    :param request: The request of the job.
+    :param status: The status of the job.
+    :param computed_at: The time the metric was last computed, 0 if it has not been computed yet.
+
+    :return: None.
+    """
+    pop_model_metric_job(metric_name)
+    lazy_model_metric_jobs[metric_name] = {'request': request, 'status': status, 'computed_at': computed_at,
+                                           'future': None}
+    model_metric_job_requests[metric_name] = request
+    job_statuses[metric_name] = status
+
+
+def compute_lazy_model_metric(job: dict):
+    """
+    Runs one cycle of a lazy model metric job. The metric is considered computed even if the cycle failed, so that a
+    failing job does not call Prometheus/Thanos and the Intelligence API on every scrape.
+
+    :param job: The lazy job as stored in lazy_model_metric_jobs.
+
+    :return: None.
+    """
+    job['computed_at'] = run_model_metric_cycle(job['request'], [], threading.Event(), job['status'], job)
+
+
+async def refresh_lazy_model_metrics():
+    """
+    Computes the lazy model metrics whose cached result is older than their ttl. A metric that is already being
+    computed (e.g. by a concurrent scrape) is not computed again, the scrape waits for the same computation. The wait
+    is bounded by LAZY_MODEL_METRICS_MAX_WAIT_SECONDS, after which the cached values are served and the computations
+    continue in the background.
+
+    :return: None.
+    """
+    if not lazy_model_metric_jobs:
+        return
+    now = time.time()
+    futures = []
+    with jobs_lock:
+        for job in lazy_model_metric_jobs.values():
+            if job['future'] is None or job['future'].done():
+                if now - job['computed_at'] < job['request'].lazy_ttl_seconds:
+                    continue
+                job['future'] = lazy_model_metrics_executor.submit(compute_lazy_model_metric, job)
+            futures.append(asyncio.wrap_future(job['future']))
+    if futures:
+        await asyncio.wait(futures, timeout=LAZY_MODEL_METRICS_MAX_WAIT_SECONDS)
+
+
+def pop_model_metric_job(metric_name: str) -> None | threading.Thread:
+    """
+    Signals the thread of a local model metric job to stop and removes it from the global dictionaries.
+    Must be called while holding jobs_lock.
+
+    :param metric_name: The metric name of the job.
+
+    :return: The thread of the job, so that the caller can join it, or None if the job does not run locally.
+    """
+    job_statuses.pop(metric_name, None)
+    model_metric_job_requests.pop(metric_name, None)
+    lazy_model_metric_jobs.pop(metric_name, None)
+    if metric_name not in stop_events:
+        return None
+    stop_events.pop(metric_name).set()
+    return threads.pop(metric_name)
+
+
+def get_owned_model_metric_jobs(jobs: dict[str, str]) -> dict[str, str]:
+    """
+    Assigns model metric jobs to the active members of the store with consistent hashing.
+
+    :param jobs: A dictionary with the metric names and the requests serialized as json of the jobs, as returned from
+    get_jobs.
+
+    :return: A dictionary with the metric names and the requests serialized as json of the jobs this worker owns.
+    """
+    heartbeat_member(MODEL_METRIC_JOBS_STORE_PATH, member_id)
+    members = get_active_members(MODEL_METRIC_JOBS_STORE_PATH, 3 * MODEL_METRIC_JOBS_SYNC_INTERVAL_SECONDS)
+    ring = build_hash_ring(members)
+    return {metric_name: request_json for metric_name, request_json in jobs.items()
+            if get_job_owner(ring, metric_name) == member_id}
+
+
+def acquire_model_metric_job_lease(metric_name: str, renew: bool = False) -> bool:
+    """
+    Takes (or renews) the lease of a model metric job at the store and keeps it locally. The lease lasts three sync
+    intervals, so it expires only if this worker stops syncing. Must be called without holding jobs_lock, as it calls
+    the store.
+
+    :param metric_name: The metric name of the job.
+    :param renew: If True, the lease is kept locally only if this worker still held it, so that a lease released while
+    it was renewed (by a stop or a failed first cycle) is not taken back. It expires at the store instead.
+
+    :return: True if this worker holds the lease of the job.
+    """
+    lease_seconds = 3 * MODEL_METRIC_JOBS_SYNC_INTERVAL_SECONDS
+    # the local expiry time is taken before the store is updated, so that it never outlasts the lease of the store
+    lease_expires = time.time() + lease_seconds
+    fencing_token = acquire_job_lease(MODEL_METRIC_JOBS_STORE_PATH, metric_name, member_id, lease_seconds)
+    with jobs_lock:
+        if fencing_token is None or (renew and metric_name not in model_metric_job_leases):
+            model_metric_job_leases.pop(metric_name, None)
+            return False
+        model_metric_job_leases[metric_name] = (fencing_token, lease_expires)
+    return True
+
+
+def renew_model_metric_job_leases():
+    """
+    Keeps this worker registered at the jobs store and renews the leases it holds, without starting or releasing any
+    job. It replaces the sync while the preload runs the first cycles of the jobs it leased.
+
+    :return: None.
+    """
+    heartbeat_member(MODEL_METRIC_JOBS_STORE_PATH, member_id)
+    with jobs_lock:
+        leased_jobs = list(model_metric_job_leases)
+    for metric_name in leased_jobs:
+        acquire_model_metric_job_lease(metric_name, renew=True)
+
+
+def holds_model_metric_job_lease(metric_name: str) -> bool:
+    """
+    Checks that this worker may publish the results of a model metric job. If jobs are not sharded, it always may.
+
+    :param metric_name: The metric name of the job.
+
+    :return: True if jobs are not sharded or this worker holds a lease of the job that has not expired.
+    """
+    if not MODEL_METRIC_JOBS_STORE_PATH:
+        return True
+    lease = model_metric_job_leases.get(metric_name)
+    return lease is not None and lease[1] > time.time()
+
+
+def remove_model_metric_job_series(request: CreateModelMetricItemRequest):
+    """
+    Removes the series that a model metric job published from the registry, the children with the labels of the job
+    (all the horizon steps) or the whole metric if it has no labels.
+
+    :param request: The request of the job.
+
+    :return: None.
+    """
+    metric = registry.get_collector(request.metric_name)
+    if metric is None:
+        return
+    if getattr(metric, '_labelnames', ()):
+        remove_matching_metric_children(metric, request.labels or {})
+    else:
+        registry.unregister(metric)
+
+
+def release_model_metric_jobs(metric_names: list[str], handed_over: bool):
+    """
+    Releases local model metric jobs: stops them, waits for their running cycles and gives their leases back. The next
+    owner takes a job only after its lease is given back (or has expired), so a job never runs at two members at the
+    same time.
+
+    :param metric_names: The metric names of the jobs.
+    :param handed_over: True if the jobs move to another member, their series are then removed as the new owner
+    publishes them. Like the stop_model_metrics route, a job that was stopped keeps its last values.
+
+    :return: None.
+    """
+    released_jobs = []
+    with jobs_lock:
+        for metric_name in metric_names:
+            request = model_metric_job_requests.get(metric_name)
+            lazy_job = lazy_model_metric_jobs.get(metric_name)
+            # the cycles already running do not publish once the lease is dropped
+            model_metric_job_leases.pop(metric_name, None)
+            model_metric_job_restarts.pop(metric_name, None)
+            job_thread = pop_model_metric_job(metric_name)
+            released_jobs.append((metric_name, request, job_thread, lazy_job['future'] if lazy_job else None))
+    for metric_name, request, job_thread, future in released_jobs:
+        if job_thread is not None:
+            job_thread.join()
+        if future is not None:
+            wait([future])
+        if handed_over and request is not None:
+            remove_model_metric_job_series(request)
+        release_job_lease(MODEL_METRIC_JOBS_STORE_PATH, metric_name, member_id)
+        logger.info('Model metric job {} released by {}.'.format(metric_name, member_id))
+
+
+def sync_model_metric_jobs():
+    """
+    Starts the model metric jobs that this worker owns and does not run yet and releases the local jobs that were
+    deleted from the store, replaced or moved to another member. An owned job is started only after its lease is taken,
+    i.e. after its previous owner released it or stopped renewing it.
+
+    :return: None.
+    """
+    jobs = get_jobs(MODEL_METRIC_JOBS_STORE_PATH)
+    owned_jobs = get_owned_model_metric_jobs(jobs)
+    with jobs_lock:
+        local_jobs = {metric_name: request.model_dump_json()
+                      for metric_name, request in model_metric_job_requests.items()}
+        # renew the leases of the local jobs that this worker still owns and of the jobs whose first cycle is still
+        # running at a request of this worker, as they are registered only after it
+        renewed_jobs = [metric_name for metric_name in local_jobs if metric_name in owned_jobs]
+        renewed_jobs += [metric_name for metric_name in model_metric_job_leases if metric_name not in local_jobs]
+    leased_jobs = {metric_name for metric_name in renewed_jobs
+                   if acquire_model_metric_job_lease(metric_name, renew=True)}
+    # the jobs deleted from the store were stopped, the ones that are still there move to another member
+    release_model_metric_jobs([metric_name for metric_name in local_jobs if metric_name not in jobs], False)
+    release_model_metric_jobs([metric_name for metric_name in local_jobs
+                               if metric_name in jobs and metric_name not in leased_jobs], True)
+    # the jobs whose request was replaced are restarted below
+    release_model_metric_jobs([metric_name for metric_name, request_json in local_jobs.items()
+                               if metric_name in leased_jobs and owned_jobs[metric_name] != request_json], False)
+    started_jobs = []
+    with jobs_lock:
+        for metric_name, request_json in owned_jobs.items():
+            # start the owned jobs that do not run (also restart the ones that failed)
+            if metric_name in lazy_model_metric_jobs:
+                continue
+            if metric_name in threads and threads[metric_name].is_alive():
+                # a restarted job that completed a cycle without error is not backed off anymore
+                status = job_statuses.get(metric_name)
+                if status is not None and status['last_run_time'] != status['last_error_time']:
+                    model_metric_job_restarts.pop(metric_name, None)
+                continue
+            # a job leased but not registered yet is being created by a request at this worker
+            if metric_name not in threads and metric_name in model_metric_job_leases:
+                continue
+            # a failed job is restarted after its backoff, keeping its status
+            failed_status = job_statuses.get(metric_name) if metric_name in threads else None
+            restarts, next_restart_time = model_metric_job_restarts.get(metric_name, (0, 0.0))
+            if failed_status is not None and time.time() < next_restart_time:
+                continue
+            started_jobs.append((metric_name, request_json, failed_status, restarts))
+    for metric_name, request_json, failed_status, restarts in started_jobs:
+        # a job still leased by its previous owner is taken at a next sync
+        if not acquire_model_metric_job_lease(metric_name):
+            continue
+        request = CreateModelMetricItemRequest.model_validate_json(request_json)
+        with jobs_lock:
+            # the job may have been registered by a request meanwhile
+            if job_statuses.get(metric_name) is not failed_status:
+                continue
+            if request.lazy_ttl_seconds:
+                register_lazy_model_metric_job(metric_name, request, create_model_metric_job_status(metric_name))
+            else:
+                job_thread, stop_event, _, _, status = start_model_metric_job(request, failed_status)
+                register_model_metric_job(metric_name, request, job_thread, stop_event, status)
+            if failed_status is not None:
+                backoff = min(MODEL_METRIC_JOBS_SYNC_INTERVAL_SECONDS * 2 ** restarts,
+                              MAX_MODEL_METRIC_JOB_RESTART_BACKOFF_SECONDS)
+                model_metric_job_restarts[metric_name] = (restarts + 1, time.time() + backoff)
+        if failed_status is not None:
+            logger.info('Model metric job {} restarted by {}, next restart in {} seconds at the earliest.'
+                        .format(metric_name, member_id, backoff))
+        else:
+            logger.info('Model metric job {} taken by {}.'.format(metric_name, member_id))
+
+
+def model_metric_jobs_coordinator():
+    """
+    Keeps this worker registered at the jobs store and syncs its model metric jobs on every interval, so that the jobs
+    are rebalanced when workers join or leave. Until the bootstrap is completed, it only renews the leases taken by the
+    preload.
+
+    :return: None.
+    """
+    while not coordinator_stop_event.is_set():
+        try:
+            if bootstrap_done.is_set():
+                sync_model_metric_jobs()
+            else:
+                renew_model_metric_job_leases()
+        except Exception as e:
+            logger.error('An error occurred in model_metric_jobs_coordinator: {}'.format(e))
+        coordinator_stop_event.wait(MODEL_METRIC_JOBS_SYNC_INTERVAL_SECONDS)
+
+
+def restore_model_metric_job(metric_name: str, previous_request_json: str | None):
+    """
+    Restores the job of the store that a model metric job failing its first cycle replaced (or deletes the job if it
+    was new) and gives its lease back if the job does not run at this worker.
+
+    :param metric_name: The metric name of the job.
+    :param previous_request_json: The request of the replaced job serialized as json or None if the job was new.
+
+    :return: None.
+    """
+    try:
+        if previous_request_json is None:
+            delete_jobs(MODEL_METRIC_JOBS_STORE_PATH, [metric_name])
+        else:
+            save_job(MODEL_METRIC_JOBS_STORE_PATH, metric_name, previous_request_json)
+        with jobs_lock:
+            if metric_name in model_metric_job_requests:
+                return
+            model_metric_job_leases.pop(metric_name, None)
+        release_job_lease(MODEL_METRIC_JOBS_STORE_PATH, metric_name, member_id)
+    except Exception as e:
+        logger.error('An error occurred in restore_model_metric_job: {}'.format(e))
+
+
+def enqueue_model_metric_job(request: CreateModelMetricItemRequest) -> dict[str, str]:
+    """
+    Validates a model metric job and starts it without waiting for its first cycle. The result of the first cycle can
+    be retrieved from the model_metric_jobs route.
+
+    :param request: The request of the model metric job.
+
+    :return: The response with the job id.
+    """
+    metric_name = request.metric_name
+    if not metric_name:
+        raise HTTPException(status_code=400, detail='metric_name is required.')
+    if request.step_in_seconds <= 0 or request.sequence_size <= 0:
+        raise HTTPException(status_code=400, detail='step_in_seconds and sequence_size must be positive.')
+    # check that a metric with the same name but different type does not exist
+    get_metric_by_name_and_type(metric_name, request.type)
+
+    # If jobs are sharded, save the job and its pending status first so that the status of its first cycle is saved too.
+    # The job starts here only if this worker owns it and its lease is free, else the coordinator of its owner starts
+    # (or restarts) it with the new request at its next sync.
+    leased = True
+    if MODEL_METRIC_JOBS_STORE_PATH:
+        request_json = request.model_dump_json()
+        save_job(MODEL_METRIC_JOBS_STORE_PATH, metric_name, request_json)
+        pending_status = create_model_metric_job_status(metric_name)
+        save_job_status(MODEL_METRIC_JOBS_STORE_PATH, metric_name, json.dumps(pending_status))
+        leased = (metric_name in get_owned_model_metric_jobs({metric_name: request_json}) and
+                  acquire_model_metric_job_lease(metric_name))
+    if leased and request.lazy_ttl_seconds:
+        # a lazy job is computed at the first scrape
+        with jobs_lock:
+            register_lazy_model_metric_job(metric_name, request, create_model_metric_job_status(metric_name))
+    elif leased:
+        job_thread, stop_event, _, _, status = start_model_metric_job(request)
+        with jobs_lock:
+            register_model_metric_job(metric_name, request, job_thread, stop_event, status)
+
+    return {'message': 'Metric creation enqueued.', 'job_id': metric_name}
+
+
 # create a metric based telemetry metric provided and model that will run
 @app.post('/create_model_metric')
 def create_model_metric_endpoint(request: CreateModelMetricItemRequest):
@@ -390,6 +1026,12 @@ def create_model_metric_endpoint(request: CreateModelMetricItemRequest):
     - model_type (mandatory): The type of the model where the retrieved telemetry data will be sent.
     - step_in_seconds (mandatory): The time distance between each sample at telemetry metric.
     - sequence_size (mandatory): The amount of samples that will be used.
+    - horizon_label (optional): If set, all the steps of the model output are published from a single inference, each
+    one as a child of the metric labeled with this label and the step index (0, 1, ...).
+    - wait_first_cycle (optional): If false, the request is validated and the job is started without waiting for its
+    first cycle. The job id is returned and the job status can be retrieved from the model_metric_jobs route.
+    - lazy_ttl_seconds (optional): If set, the metric is not computed every step_in_seconds, but when /metrics is
+    scraped and its last computation is older than this ttl.
 
     According to the metric type value:
 
@@ -448,30 +1090,128 @@ def create_model_metric_endpoint(request: CreateModelMetricItemRequest):
     :return: a json response 400 if error occurs or 200 if telemetry data are found, model inference is successful and
     model results are sent to Prometheus/Thanos.
     """
+    if not request.wait_first_cycle:
+        try:
+            return enqueue_model_metric_job(request)
+        except HTTPException as http_exc:
+            logger.error('HTTPException: {}'.format(http_exc.detail))
+            raise http_exc
+
+    previous_request_json = None
     try:
-        # Create a stop event for this specific request
-        stop_event = threading.Event()
-        # Run the first cycle and send immediate response
-        exception_list = []
-        first_cycle_done = threading.Event()
-        first_cycle_thread = threading.Thread(target=create_model_telemetry_metric, args=(request, exception_list,
-                                                                                          first_cycle_done, stop_event))
-        first_cycle_thread.start()
-        first_cycle_done.wait()  # Wait for the first cycle to complete
-        if exception_list:
-            raise exception_list[0]
-
-        # Store the thread and stop event in the global dictionaries
-        threads[request.metric_name] = first_cycle_thread
-        stop_events[request.metric_name] = stop_event
-
-        return {'message': 'First cycle completed successfully. Metric creation started.'}
+        # If jobs are sharded, save the job and take its lease before its first cycle. If another worker holds the
+        # lease, that worker restarts the job with the new request at its next sync.
+        if MODEL_METRIC_JOBS_STORE_PATH:
+            previous_request_json = save_job(MODEL_METRIC_JOBS_STORE_PATH, request.metric_name,
+                                             request.model_dump_json())
+            leased = acquire_model_metric_job_lease(request.metric_name)
+            if not leased:
+                return {'message': 'Metric creation handed over to the worker running the job.',
+                        'job_id': request.metric_name}
+
+        if request.lazy_ttl_seconds:
+            # Run the first cycle here, the next ones will run on scrape
+            status = create_model_metric_job_status(request.metric_name)
+            exception_list = []
+            start_time = run_model_metric_cycle(request, exception_list, threading.Event(), status)
+            if exception_list:
+                raise exception_list[0]
+            with jobs_lock:
+                register_lazy_model_metric_job(request.metric_name, request, status, computed_at=start_time)
+        else:
+            # Run the first cycle and send immediate response
+            first_cycle_thread, stop_event, exception_list, first_cycle_done, status = start_model_metric_job(request)
+            first_cycle_done.wait()  # Wait for the first cycle to complete
+            if exception_list:
+                raise exception_list[0]
+
+            # Store the thread, stop event and status in the global dictionaries
+            with jobs_lock:
+                register_model_metric_job(request.metric_name, request, first_cycle_thread, stop_event, status)
+
+        # If jobs are sharded, save its status. If its owner is another worker, the coordinator hands the job over to
+        # it at the next sync.
+        if MODEL_METRIC_JOBS_STORE_PATH:
+            save_job_status(MODEL_METRIC_JOBS_STORE_PATH, request.metric_name, json.dumps(status))
+
+        return {'message': 'First cycle completed successfully. Metric creation started.',
+                'job_id': request.metric_name}
     except Exception as e:
         http_err = 'An error occurred in create_model_metric_endpoint: {}'.format(e)
         logger.error(http_err)
+        if MODEL_METRIC_JOBS_STORE_PATH:
+            restore_model_metric_job(request.metric_name, previous_request_json)
         raise HTTPException(status_code=400, detail='{}'.format(e))
 
 
+@app.post('/backfill_model_metric')
+def backfill_model_metric(request: BackfillModelMetricItemRequest):
+    """
+    backfill_model_metric route will replay a model over a past time range and return the results as an OpenMetrics
+    file, that can be imported to Prometheus with 'promtool tsdb create-blocks-from openmetrics'. The whole range is
+    retrieved with a single query and the model is inferred in batches.
+
+    :param request: The json passed will contain the fields of the create_model_metric route and:
+
+    - start_time (mandatory): The time of the first backfilled value, in '%Y-%m-%dT%H:%M:%SZ' format.
+    - end_time (mandatory): The time of the last backfilled value, in '%Y-%m-%dT%H:%M:%SZ' format.
+    - batch_size (optional): How many input series are sent to the model at each call (default 256).
+    - timeout_seconds (optional): The amount of time in seconds to wait for the query (default 60).
+
+    :return: a plain text response 200 with the OpenMetrics file or 400 if error occurs.
+    """
+    try:
+        start_timestamp = datetime.strptime(request.start_time, '%Y-%m-%dT%H:%M:%SZ')
+        end_timestamp = datetime.strptime(request.end_time, '%Y-%m-%dT%H:%M:%SZ')
+        if end_timestamp <= start_timestamp:
+            raise ValueError('end_time must be after start_time.')
+        if request.step_in_seconds <= 0 or request.sequence_size <= 0 or request.batch_size <= 0:
+            raise ValueError('step_in_seconds, sequence_size and batch_size must be positive.')
+        if request.type == MetricType.Info:
+            raise ValueError('Info metrics can not be backfilled.')
+
+        # query the whole range, including the past values of the first window
+        query_start_time = get_backfill_query_start_time(request.start_time, request.step_in_seconds,
+                                                         request.sequence_size)
+        query_url = create_prometheus_range_query_url(PROMETHEUS_BASE_URL, request.telemetry_metric,
+                                                      request.step_in_seconds, request.sequence_size,
+                                                      end_time=request.end_time, start_time=query_start_time)
+        query_results = call_prometheus_query_url_with_timeout(query_url, timeout=request.timeout_seconds)
+        if not query_results:
+            raise ValueError('Telemetry metric not found or returned null results.')
+        timestamps, windows = create_sliding_windows(query_results, request.sequence_size,
+                                                     (start_timestamp - datetime(1970, 1, 1)).total_seconds())
+        if not windows:
+            raise ValueError('No samples in range from start_time to end_time.')
+
+        # infer the model in batches
+        horizons = []
+        for batch_start in range(0, len(windows), request.batch_size):
+            batch = [window.tolist() for window in windows[batch_start:batch_start + request.batch_size]]
+            # the input series are sent as a batch, the model returns one result per series in the same order
+            model_result_status_code, model_result = call_intelligence_api_model(request, batch)
+            if model_result_status_code != 200 or len(model_result) != len(batch):
+                raise ValueError('Intelligence API error or endpoint does not exist.')
+            horizons.extend(get_model_result_horizon([result]) for result in model_result)
+
+        # build a series per horizon step, or only the first value as the create_model_metric route does
+        steps = len(horizons[0]) if request.horizon_label else 1
+        series = []
+        for step in range(steps):
+            labels = {key: str(value) for key, value in (request.labels or {}).items()}
+            if request.horizon_label:
+                labels[request.horizon_label] = str(step)
+            series.append((labels, [(timestamp, horizon[step]) for timestamp, horizon in zip(timestamps, horizons)
+                                    if step < len(horizon)]))
+        return PlainTextResponse(format_openmetrics_backfill(request.type, request.metric_name, request.metric_info,
+                                                             series, request.states),
+                                 media_type='application/openmetrics-text; version=1.0.0; charset=utf-8')
+    except Exception as e:
+        http_err = 'An error occurred in backfill_model_metric: {}'.format(e)
+        logger.error(http_err)
+        raise HTTPException(status_code=400, detail='{}'.format(getattr(e, 'detail', e)))
+
+
 @app.post('/stop_model_metrics')
 def stop_model_metrics(request: StopModelMetricItemRequest):
     """
@@ -484,19 +1224,26 @@ def stop_model_metrics(request: StopModelMetricItemRequest):
     :return: a json response 200 if the metric creations are stopped successfully even if metric may not exist.
     """
     try:
+        metric_names = []
         for request_metric_name in request.metric_names:
             # Get the metric name
             metric_name = request_metric_name.strip() if request_metric_name else None
             if not metric_name:
                 raise HTTPException(status_code=400, detail='metric_name is required.')
-
-            # Stop the corresponding thread
-            if metric_name in stop_events:
-                stop_events[metric_name].set()
-                threads[metric_name].join()
-                # Clean up the global dictionaries
-                del threads[metric_name]
-                del stop_events[metric_name]
+            metric_names.append(metric_name)
+
+        # If jobs are sharded, delete them from the store so that their owners stop them at their next sync
+        if MODEL_METRIC_JOBS_STORE_PATH:
+            delete_jobs(MODEL_METRIC_JOBS_STORE_PATH, metric_names)
+
+        for metric_name in metric_names:
+            # Stop the corresponding thread and clean up the global dictionaries
+            with jobs_lock:
+                model_metric_job_leases.pop(metric_name, None)
+                model_metric_job_restarts.pop(metric_name, None)
+                job_thread = pop_model_metric_job(metric_name)
+            if job_thread is not None:
+                job_thread.join()
             # else:
             #     raise HTTPException(status_code=400, detail='Metric not found.')
         return {'message': 'Metric creation(s) stopped successfully.'}
@@ -506,8 +1253,216 @@ def stop_model_metrics(request: StopModelMetricItemRequest):
         raise HTTPException(status_code=400, detail='{}'.format(e))
 
 
+@app.get('/model_metric_jobs')
+def get_model_metric_jobs():
+    """
+    model_metric_jobs route will return the status of all the model metric jobs.
+
+    :return: a json response 200 with a list of the job statuses. Each status contains the job id, the worker owning
+    it, the first cycle result, the last run time, the last error and the cycle latency statistics.
+    """
+    if MODEL_METRIC_JOBS_STORE_PATH:
+        statuses = [json.loads(status_json) for status_json in get_job_statuses(MODEL_METRIC_JOBS_STORE_PATH).values()]
+    else:
+        with jobs_lock:
+            statuses = [dict(status) for status in job_statuses.values()]
+    return {'jobs': statuses}
+
+
+@app.get('/model_metric_jobs/{job_id}')
+def get_model_metric_job(job_id: str):
+    """
+    model_metric_jobs/{job_id} route will return the status of a model metric job.
+
+    :param job_id: The job id returned from the create_model_metric route (the metric name).
+
+    :return: a json response 200 with the job status or 404 if the job does not exist.
+    """
+    if MODEL_METRIC_JOBS_STORE_PATH:
+        status_json = get_job_statuses(MODEL_METRIC_JOBS_STORE_PATH).get(job_id)
+        status = json.loads(status_json) if status_json else None
+    else:
+        with jobs_lock:
+            status = dict(job_statuses[job_id]) if job_id in job_statuses else None
+    if status is None:
+        raise HTTPException(status_code=404, detail='Job not found.')
+    return status
+
+
+def preload_metrics(config: PreloadConfig) -> list[str]:
+    """
+    Registers the metrics defined at the preload config without setting their values.
+
+    :param config: The preload config.
+
+    :return: A list with the errors that occurred.
+    """
+    errors = []
+    for metric in config.metrics:
+        try:
+            if get_metric_by_name_and_type(metric.metric_name, metric.type) is None:
+                register_metric(metric_type=metric.type, metric_name=metric.metric_name, metric_info=metric.metric_info,
+                                label_names=metric.labels, states=metric.states)
+        except (HTTPException, ValueError) as e:
+            errors.append('{}: {}'.format(metric.metric_name, getattr(e, 'detail', e)))
+    return errors
+
+
+def run_preload_first_cycle(request: CreateModelMetricItemRequest) -> None | Exception:
+    """
+    Starts a preloaded model metric job, waits for its first cycle and registers it even if the first cycle failed, so
+    that its status can be retrieved. If jobs are sharded, its lease is taken right before its first cycle, and a job
+    that is already running at this worker or leased by another worker is skipped.
+
+    :param request: The request of the model metric job.
+
+    :return: The exception raised at the first cycle or None.
+    """
+    if MODEL_METRIC_JOBS_STORE_PATH:
+        with jobs_lock:
+            running = request.metric_name in model_metric_job_requests
+        if running or not acquire_model_metric_job_lease(request.metric_name):
+            return None
+    if request.lazy_ttl_seconds:
+        # a lazy job is computed at the first scrape
+        with jobs_lock:
+            register_lazy_model_metric_job(request.metric_name, request,
+                                           create_model_metric_job_status(request.metric_name))
+        return None
+    job_thread, stop_event, exception_list, first_cycle_done, status = start_model_metric_job(request)
+    first_cycle_done.wait()
+    with jobs_lock:
+        register_model_metric_job(request.metric_name, request, job_thread, stop_event, status)
+        lease = model_metric_job_leases.get(request.metric_name)
+    # the first cycle ran before the job was registered, so its status was not saved at the store
+    if MODEL_METRIC_JOBS_STORE_PATH and lease is not None:
+        save_job_status(MODEL_METRIC_JOBS_STORE_PATH, request.metric_name, json.dumps(status),
+                        fencing_token=lease[0])
+    return exception_list[0] if exception_list else None
+
+
+def preload_model_metrics(config: PreloadConfig) -> list[str]:
+    """
+    Starts the model metric jobs defined at the preload config and runs their first cycles concurrently, with at most
+    PRELOAD_MAX_PARALLELISM cycles running at the same time. If jobs are sharded, all jobs are saved at the store and
+    only the ones this worker owns and could lease are started.
+
+    :param config: The preload config.
+
+    :return: A list with the errors that occurred.
+    """
+    requests = config.model_metrics
+    if MODEL_METRIC_JOBS_STORE_PATH:
+        for request in requests:
+            # the status of a job that is already running at another worker is not reset
+            if save_job(MODEL_METRIC_JOBS_STORE_PATH, request.metric_name, request.model_dump_json()) is None:
+                save_job_status(MODEL_METRIC_JOBS_STORE_PATH, request.metric_name,
+                                json.dumps(create_model_metric_job_status(request.metric_name)))
+        owned_jobs = get_owned_model_metric_jobs(get_jobs(MODEL_METRIC_JOBS_STORE_PATH))
+        requests = [request for request in requests if request.metric_name in owned_jobs]
+    errors = []
+    with ThreadPoolExecutor(max_workers=max(PRELOAD_MAX_PARALLELISM, 1)) as executor:
+        for request, error in zip(requests, executor.map(run_preload_first_cycle, requests)):
+            if error:
+                errors.append('{}: {}'.format(request.metric_name, getattr(error, 'detail', error)))
+    return errors
+
+
+def bootstrap():
+    """
+    Starts the jobs coordinator if jobs are sharded, so that the leases taken by the preload are renewed while it runs,
+    then preloads the metrics and the model metric jobs of the PRELOAD_CONFIG_PATH file and marks the app as ready.
+
+    :return: None.
+    """
+    start_time = time.time()
+    if MODEL_METRIC_JOBS_STORE_PATH:
+        threading.Thread(target=model_metric_jobs_coordinator, daemon=True).start()
+    if PRELOAD_CONFIG_PATH:
+        try:
+            with open(PRELOAD_CONFIG_PATH) as config_file:
+                config = PreloadConfig.model_validate_json(config_file.read())
+            errors = preload_metrics(config) + preload_model_metrics(config)
+            bootstrap_summary.update({'metrics': len(config.metrics), 'model_metrics': len(config.model_metrics),
+                                      'errors': errors})
+        except Exception as e:
+            bootstrap_summary.update({'errors': ['Preload config error: {}'.format(e)]})
+        for error in bootstrap_summary['errors']:
+            logger.error('Preload error: {}'.format(error))
+    bootstrap_summary['bootstrap_seconds'] = time.time() - start_time
+    bootstrap_done.set()
+    logger.info('Bootstrap completed: {}'.format(bootstrap_summary))
+
+
+@app.get('/ready')
+def ready():
+    """
+    ready route will be used as readiness probe.
+
+    :return: a json response 200 with the preload summary if the preload of the startup is completed else 503.
+    """
+    if not bootstrap_done.is_set():
+        raise HTTPException(status_code=503, detail='Preload in progress.')
+    return bootstrap_summary
+
+
+@app.post('/admin/profiling/start')
+def start_profiling_endpoint(request: StartProfilingItemRequest):
+    """
+    admin/profiling/start route will start a profiling session for a bounded time window. It is available only if
+    PROFILING_ENABLED is true.
+
+    :param request: The json passed will contain:
+
+    - mode (optional): 'sampling' (default) samples the stacks of all threads, 'deterministic' profiles every call of
+    the hot paths (create_metric, the metric type functions, the registry lookups, the registry collection of the
+    /metrics exposition and the model metric job pipeline).
+    - duration_seconds (optional): The time window after which the session stops automatically (default 60, at most
+    300).
+    - sampling_interval_seconds (optional): The time between two samples at sampling mode (default 0.01).
+
+    :return: a json response 200 if the session started, 400 if a session is already running or 404 if disabled.
+    """
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail='Not Found')
+    try:
+        start_profiling(request.mode.value, request.duration_seconds, request.sampling_interval_seconds)
+    except ValueError as e:
+        logger.error('HTTPException: {}'.format(e))
+        raise HTTPException(status_code=400, detail='{}'.format(e))
+    return {'message': 'Profiling started.'}
+
+
+@app.post('/admin/profiling/stop')
+def stop_profiling_endpoint():
+    """
+    admin/profiling/stop route will stop the running profiling session. It is available only if PROFILING_ENABLED is
+    true.
+
+    :return: a plain text response 200 with the profile of the session stopped (or of the last session if it has already
+    stopped), collapsed stacks for sampling mode or pstats text for deterministic mode, 400 if no session has run or
+    404 if disabled.
+    """
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail='Not Found')
+    profile = stop_profiling()
+    if profile is None:
+        raise HTTPException(status_code=400, detail='No profiling session has run.')
+    return PlainTextResponse(profile)
+
+
+@app.on_event("startup")
+def startup_event():
+    threading.Thread(target=bootstrap, daemon=True).start()
+
+
 @app.on_event("shutdown")
 def shutdown_event():
+    # leave the jobs store and give back the leases so that the jobs of this worker are taken over by the other members
+    if MODEL_METRIC_JOBS_STORE_PATH:
+        coordinator_stop_event.set()
+        remove_member(MODEL_METRIC_JOBS_STORE_PATH, member_id)
+        release_model_metric_jobs(list(model_metric_job_requests), True)
     for event in stop_events.values():
         event.set()
     for thread in threads.values():
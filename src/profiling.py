@@ -0,0 +1,196 @@
+import cProfile
+import functools
+import io
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# The longest time window a profiling session can run before it is stopped automatically
+MAX_PROFILING_DURATION_SECONDS = 300
+# The longest time stop_profiling waits for the profiled calls that are running to return
+MAX_PROFILED_CALLS_WAIT_SECONDS = 5
+# The active profiling session (None when profiling is off) and the profile of the last session that was stopped
+profiling_session = None
+last_profile = None
+profiling_lock = threading.Lock()
+# Notified when a profiled call returns, so that stop_profiling can wait for the running ones
+profiled_calls_done = threading.Condition(profiling_lock)
+# Depth of the profiled calls of each thread, so that only the outermost call enables the thread profiler
+_thread_state = threading.local()
+
+
+def _new_session(mode: str, duration_seconds: float, sampling_interval_seconds: float) -> dict:
+    return {
+        'mode': mode,
+        'started_at': time.time(),
+        'duration_seconds': duration_seconds,
+        'sampling_interval_seconds': sampling_interval_seconds,
+        # deterministic mode: a cProfile.Profile per thread and the threads whose profile is enabled
+        'profiles': {},
+        'active_threads': set(),
+        # sampling mode: the collapsed stacks and the times they were sampled, and the sampler thread
+        'stacks': Counter(),
+        'sampler': None,
+        'stop_event': threading.Event(),
+    }
+
+
+def _sample_stacks(session: dict):
+    """
+    Samples the stacks of all the threads (except the sampler) every sampling interval till the session is stopped.
+
+    :param session: The profiling session.
+
+    :return: None.
+    """
+    sampler_id = threading.get_ident()
+    while not session['stop_event'].wait(session['sampling_interval_seconds']):
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == sampler_id:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append('{}:{}'.format(frame.f_code.co_filename, frame.f_code.co_name))
+                frame = frame.f_back
+            session['stacks'][';'.join(reversed(stack))] += 1
+
+
+def _format_profile(session: dict, profiles: list[cProfile.Profile], running_calls: int) -> str:
+    """
+    Formats the results of a profiling session. The sampler thread of the session must have stopped.
+
+    :param session: The profiling session.
+    :param profiles: The profiles of the threads whose profiled calls have all returned (deterministic mode).
+    :param running_calls: The number of threads whose profiled calls were still running and are left out.
+
+    :return: Collapsed stacks (one "stack count" per line) for sampling mode or pstats text for deterministic mode.
+    """
+    if session['mode'] == 'sampling':
+        return '\n'.join('{} {}'.format(stack, count) for stack, count in session['stacks'].most_common())
+    if not profiles:
+        return 'No profiled calls.'
+    output = io.StringIO()
+    if running_calls:
+        output.write('The calls of {} threads were still running and are not included.\n'.format(running_calls))
+    stats = pstats.Stats(profiles[0], stream=output)
+    for profile in profiles[1:]:
+        stats.add(profile)
+    stats.sort_stats('cumulative').print_stats()
+    return output.getvalue()
+
+
+def start_profiling(mode: str, duration_seconds: float, sampling_interval_seconds: float = 0.01):
+    """
+    Starts a profiling session that will stop automatically after the duration passed.
+
+    :param mode: 'sampling' to sample the stacks of all threads or 'deterministic' to profile the calls of the hot
+    paths (the functions decorated with profiled).
+    :param duration_seconds: The time window of the session, at most MAX_PROFILING_DURATION_SECONDS.
+    :param sampling_interval_seconds: The time between two samples at sampling mode.
+
+    :return: None.
+    """
+    global profiling_session
+    if duration_seconds <= 0 or duration_seconds > MAX_PROFILING_DURATION_SECONDS:
+        raise ValueError('duration_seconds must be positive and at most {}.'.format(MAX_PROFILING_DURATION_SECONDS))
+    if sampling_interval_seconds <= 0:
+        raise ValueError('sampling_interval_seconds must be positive.')
+    with profiling_lock:
+        if profiling_session is not None:
+            raise ValueError('A profiling session is already running.')
+        session = _new_session(mode, duration_seconds, sampling_interval_seconds)
+        profiling_session = session
+    if mode == 'sampling':
+        session['sampler'] = threading.Thread(target=_sample_stacks, args=(session,), daemon=True)
+        session['sampler'].start()
+    timer = threading.Timer(duration_seconds, stop_profiling, args=(session,))
+    timer.daemon = True
+    timer.start()
+
+
+def stop_profiling(session: dict | None = None) -> str | None:
+    """
+    Stops the running profiling session and keeps its profile.
+
+    :param session: Stop only if this is the running session (used by the timer of the session).
+
+    :return: The profile of the session stopped, or of the last session if none is running, or None.
+    """
+    global profiling_session, last_profile
+    with profiled_calls_done:
+        running_session = profiling_session
+        if running_session is None or (session is not None and session is not running_session):
+            return last_profile
+        profiling_session = None
+        running_session['stop_event'].set()
+        # no new profiled call starts, wait for the running ones so that their profiles are not read while written
+        profiled_calls_done.wait_for(lambda: not running_session['active_threads'], MAX_PROFILED_CALLS_WAIT_SECONDS)
+        profiles = [profile for thread_id, profile in running_session['profiles'].items()
+                    if thread_id not in running_session['active_threads']]
+        running_calls = len(running_session['active_threads'])
+    if running_session['sampler'] is not None:
+        running_session['sampler'].join()
+    last_profile = _format_profile(running_session, profiles, running_calls)
+    return last_profile
+
+
+def _end_profiled_call(session: dict, thread_id: int):
+    with profiled_calls_done:
+        session['active_threads'].discard(thread_id)
+        profiled_calls_done.notify_all()
+
+
+@contextmanager
+def profiling_scope():
+    """
+    Profiles the code inside the scope when a deterministic profiling session is running. When profiling is off it
+    only checks a global.
+
+    :return: None.
+    """
+    session = profiling_session
+    if session is None or session['mode'] != 'deterministic' or getattr(_thread_state, 'depth', 0):
+        yield
+        return
+    thread_id = threading.get_ident()
+    with profiling_lock:
+        # the session may have been stopped meanwhile
+        if session is not profiling_session:
+            profile = None
+        else:
+            profile = session['profiles'].setdefault(thread_id, cProfile.Profile())
+            session['active_threads'].add(thread_id)
+    if profile is None:
+        yield
+        return
+    _thread_state.depth = 1
+    try:
+        profile.enable()
+    except ValueError:
+        # another profiler is active at this thread
+        _thread_state.depth = 0
+        _end_profiled_call(session, thread_id)
+        yield
+        return
+    try:
+        yield
+    finally:
+        profile.disable()
+        _thread_state.depth = 0
+        _end_profiled_call(session, thread_id)
+
+
+def profiled(func):
+    """
+    Decorator that marks a hot path function to be profiled when a deterministic profiling session is running.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if profiling_session is None:
+            return func(*args, **kwargs)
+        with profiling_scope():
+            return func(*args, **kwargs)
+    return wrapper
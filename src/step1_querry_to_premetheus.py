@@ -3,7 +3,7 @@ from datetime import datetime, timedelta
 import requests
 
 
-def create_prometheus_range_query_url(base_url, query, step_in_seconds, sequence_size, end_time=None):
+def create_prometheus_range_query_url(base_url, query, step_in_seconds, sequence_size, end_time=None, start_time=None):
     """
     Creates the URL that will ask prometheus/Thanos for the specific metric.
 
@@ -12,6 +12,7 @@ def create_prometheus_range_query_url(base_url, query, step_in_seconds, sequence
     :param step_in_seconds: The step at witch the query will get the past values from prometheus/Thanos.
     :param sequence_size: How many past values are ideally wanted.
     :param end_time: Till what time to query. Default will be the current time that the function is called.
+    :param start_time: From what time to query. Default will be sequence_size + 1 steps before end_time.
 
     :return: The url with all the info.
     """
@@ -21,12 +22,14 @@ def create_prometheus_range_query_url(base_url, query, step_in_seconds, sequence
     if end_timestamp is None:
         end_timestamp = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
 
-    # Convert string to datetime object
-    start_timestamp = datetime.strptime(end_timestamp, '%Y-%m-%dT%H:%M:%SZ')
-    # Subtract the sequence_size * step_in_seconds
-    start_timestamp = start_timestamp - timedelta(seconds=(sequence_size+1)*step_in_seconds)
-    # Convert back to ISO 8601 format string with 'Z'
-    start_timestamp = start_timestamp.strftime('%Y-%m-%dT%H:%M:%SZ')
+    start_timestamp = start_time
+    if start_timestamp is None:
+        # Convert string to datetime object
+        start_timestamp = datetime.strptime(end_timestamp, '%Y-%m-%dT%H:%M:%SZ')
+        # Subtract the sequence_size * step_in_seconds
+        start_timestamp = start_timestamp - timedelta(seconds=(sequence_size+1)*step_in_seconds)
+        # Convert back to ISO 8601 format string with 'Z'
+        start_timestamp = start_timestamp.strftime('%Y-%m-%dT%H:%M:%SZ')
 
     # set step to a format of seconds that prometheus/Thanos understand
     step = str(step_in_seconds) + 's'